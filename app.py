@@ -3,12 +3,15 @@ Smart Route Planner - NexGen Logistics Innovation Challenge
 An intelligent routing system that optimizes for cost, time, and environmental impact
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from partition_store import prepare_routes, read_manifest, manifest_options, prune_partitions, read_partitions
+from precompute import PrecomputeWorker, compute_results
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -53,58 +56,51 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
-@st.cache_data
-def load_data():
-    """Load and prepare route data"""
+@st.cache_data(max_entries=2)
+def load_data(source_mtime):
+    """Load and prepare route data; source_mtime keys the cache to the current CSV"""
     try:
         df = pd.read_csv('routes_data.csv')
     except:
         st.error("Error loading data file. Please ensure routes_data.csv is in the same directory.")
         return None
     
-    # Handle missing values
-    df['Weather_Impact'] = df['Weather_Impact'].fillna('None')
-    
-    # Calculate derived metrics
-    FUEL_PRICE_PER_LITER = 102.0  # INR
-    CO2_PER_LITER = 2.68  # kg CO2 per liter of fuel
-    
-    df['Fuel_Cost_INR'] = df['Fuel_Consumption_L'] * FUEL_PRICE_PER_LITER
-    df['Total_Cost_INR'] = df['Fuel_Cost_INR'] + df['Toll_Charges_INR']
-    df['CO2_Emissions_KG'] = df['Fuel_Consumption_L'] * CO2_PER_LITER
-    df['Total_Time_Hours'] = (df['Distance_KM'] / 60) + (df['Traffic_Delay_Minutes'] / 60)
-    df['Efficiency_Score'] = 100 - ((df['Total_Cost_INR'] / df['Total_Cost_INR'].max() * 30) + 
-                                     (df['Total_Time_Hours'] / df['Total_Time_Hours'].max() * 30) +
-                                     (df['CO2_Emissions_KG'] / df['CO2_Emissions_KG'].max() * 40))
-    
-    # Extract origin and destination
-    df[['Origin', 'Destination']] = df['Route'].str.split('-', expand=True)
-    
-    # Categorize routes
-    df['Route_Type'] = df['Destination'].apply(
-        lambda x: 'International' if x in ['Dubai', 'Singapore', 'Hong Kong', 'Bangkok'] else 'Domestic'
-    )
-    
-    return df
+    return prepare_routes(df)
 
-# Calculate optimization scores
-def calculate_optimization_scores(df_filtered):
-    """Calculate optimization scores for different priorities"""
-    scores = {}
-    
-    # Cost Optimization (minimize total cost)
-    df_filtered['Cost_Score'] = 100 - (df_filtered['Total_Cost_INR'] / df_filtered['Total_Cost_INR'].max() * 100)
-    
-    # Time Optimization (minimize time)
-    df_filtered['Time_Score'] = 100 - (df_filtered['Total_Time_Hours'] / df_filtered['Total_Time_Hours'].max() * 100)
-    
-    # Environmental Optimization (minimize emissions)
-    df_filtered['Eco_Score'] = 100 - (df_filtered['CO2_Emissions_KG'] / df_filtered['CO2_Emissions_KG'].max() * 100)
-    
-    # Balanced Score (equal weights)
-    df_filtered['Balanced_Score'] = (df_filtered['Cost_Score'] + df_filtered['Time_Score'] + df_filtered['Eco_Score']) / 3
-    
-    return df_filtered
+def get_data_version():
+    """Return the modification time of routes_data.csv, or None if it is missing"""
+    try:
+        return os.path.getmtime('routes_data.csv')
+    except OSError:
+        return None
+
+# Load only the partitions that can match the sidebar filters
+@st.cache_data(max_entries=32)
+def load_partitioned_data(built_at, paths):
+    """Load pruned partitions; built_at keys the cache to the current partition build"""
+    # Keyed on the partitions read rather than the slider range, so distance
+    # filtering stays row-level in compute_results and entries stay few
+    manifest = read_manifest()
+    if manifest is None or manifest['built_at'] != built_at:
+        return None
+    return read_partitions(manifest, [p for p in manifest['partitions'] if p['path'] in paths])
+
+def get_filter_options(df):
+    """Collect sidebar filter values from the full dataset"""
+    return {
+        'route_types': list(df['Route_Type'].unique()),
+        'origins': sorted(df['Origin'].unique().tolist()),
+        'destinations': sorted(df['Destination'].unique().tolist()),
+        'weather': sorted([x for x in df['Weather_Impact'].unique() if pd.notna(x)]),
+        'distance_min': float(df['Distance_KM'].min()),
+        'distance_max': float(df['Distance_KM'].max()),
+    }
+
+# Background precomputation, started once per server process
+@st.cache_resource
+def get_precompute_worker():
+    """Start the worker that warms data and precomputes popular queries"""
+    return PrecomputeWorker().start()
 
 # Main app
 def main():
@@ -113,37 +109,47 @@ def main():
     st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">NexGen Logistics Innovation Challenge - Optimizing Routes for Cost, Time & Environment</p>', unsafe_allow_html=True)
     st.markdown("---")
     
-    # Load data
-    df = load_data()
-    if df is None:
-        return
+    worker = get_precompute_worker()
+    
+    # Load data: prefer the partitioned layout, then the warmed dataset, then the flat CSV
+    manifest = read_manifest()
+    df = None
+    if manifest is not None:
+        options = manifest_options(manifest)
+    else:
+        df = worker.data()
+        if df is None:
+            df = load_data(get_data_version())
+        if df is None:
+            return
+        options = get_filter_options(df)
     
     # Sidebar filters
     st.sidebar.header("🔍 Filter Options")
     
     # Route type filter
-    route_types = ['All'] + list(df['Route_Type'].unique())
+    route_types = ['All'] + options['route_types']
     selected_route_type = st.sidebar.selectbox("Route Type", route_types)
     
     # Origin filter
-    origins = ['All'] + sorted(df['Origin'].unique().tolist())
+    origins = ['All'] + options['origins']
     selected_origin = st.sidebar.selectbox("Origin City", origins)
     
     # Destination filter
-    destinations = ['All'] + sorted(df['Destination'].unique().tolist())
+    destinations = ['All'] + options['destinations']
     selected_destination = st.sidebar.selectbox("Destination City", destinations)
     
     # Weather filter
-    weather_conditions = ['All'] + sorted([x for x in df['Weather_Impact'].unique() if pd.notna(x)])
+    weather_conditions = ['All'] + options['weather']
     selected_weather = st.sidebar.selectbox("Weather Condition", weather_conditions)
     
     # Distance range
     st.sidebar.subheader("Distance Range (KM)")
     distance_range = st.sidebar.slider(
         "Select Range",
-        float(df['Distance_KM'].min()),
-        float(df['Distance_KM'].max()),
-        (float(df['Distance_KM'].min()), float(df['Distance_KM'].max()))
+        options['distance_min'],
+        options['distance_max'],
+        (options['distance_min'], options['distance_max'])
     )
     
     # Optimization priority
@@ -154,33 +160,56 @@ def main():
         ["Balanced", "Cost", "Time", "Environmental"]
     )
     
-    # Apply filters
-    df_filtered = df.copy()
-    
-    if selected_route_type != 'All':
-        df_filtered = df_filtered[df_filtered['Route_Type'] == selected_route_type]
-    
-    if selected_origin != 'All':
-        df_filtered = df_filtered[df_filtered['Origin'] == selected_origin]
-    
-    if selected_destination != 'All':
-        df_filtered = df_filtered[df_filtered['Destination'] == selected_destination]
-    
-    if selected_weather != 'All':
-        df_filtered = df_filtered[df_filtered['Weather_Impact'] == selected_weather]
-    
-    df_filtered = df_filtered[
-        (df_filtered['Distance_KM'] >= distance_range[0]) & 
-        (df_filtered['Distance_KM'] <= distance_range[1])
-    ]
-    
-    # Calculate optimization scores
-    df_filtered = calculate_optimization_scores(df_filtered)
+    # Use precomputed results when the worker has them, otherwise compute now
+    filters = (selected_route_type, selected_origin, selected_destination, selected_weather, tuple(distance_range))
+    # Reruns from widgets below the sidebar repeat the same query, so count each query once
+    query = (filters, optimization_priority)
+    is_new_query = st.session_state.get('last_query') != query
+    st.session_state['last_query'] = query
+    if is_new_query:
+        worker.record_query(filters, optimization_priority)
+    results = worker.get(filters, optimization_priority, count=is_new_query)
+    if results is None:
+        # Apply filters (partition pruning first when available, then row-level filters)
+        df_filtered = None
+        if manifest is not None:
+            partitions = prune_partitions(
+                manifest,
+                route_type=selected_route_type,
+                origin=selected_origin,
+                destination=selected_destination,
+                weather=selected_weather,
+                distance_range=tuple(distance_range)
+            )
+            df_filtered = load_partitioned_data(manifest['built_at'], tuple(p['path'] for p in partitions))
+        if df_filtered is None:
+            df_filtered = df if df is not None else load_data(get_data_version())
+            if df_filtered is None:
+                return
+        results = compute_results(df_filtered, filters, optimization_priority)
+    
+    df_filtered = results['routes']
+    best_routes = results['best_routes']
+    metric_col = results['metric_col']
+    metric_name = results['metric_name']
+    metric_format = results['metric_format']
     
     # Display results count
     st.sidebar.markdown("---")
     st.sidebar.metric("📊 Routes Found", len(df_filtered))
     
+    # Precomputation metrics
+    cache_metrics = worker.metrics()
+    with st.sidebar.expander("⚡ Precompute Cache"):
+        st.write(f"**Status:** {cache_metrics['state'].title()}")
+        st.write(f"**Warm-up:** {cache_metrics['warmed']} / {cache_metrics['to_warm']} queries")
+        st.write(f"**Hit Rate:** {cache_metrics['hit_rate']:.1%} "
+                 f"({cache_metrics['hits']} hits, {cache_metrics['misses']} misses)")
+        st.write(f"**Data Refreshes:** {cache_metrics['refreshes']}")
+        st.write(f"**Failed Queries:** {cache_metrics['failed']}")
+        if cache_metrics['last_error']:
+            st.write(f"**Last Error:** {cache_metrics['last_error']}")
+    
     # Export functionality
     if len(df_filtered) > 0:
         csv = df_filtered.to_csv(index=False)
@@ -226,28 +255,6 @@ def main():
     # Optimization recommendations
     st.markdown('<h2 class="sub-header">💡 Optimization Recommendations</h2>', unsafe_allow_html=True)
     
-    # Get best routes based on priority
-    if optimization_priority == "Cost":
-        best_routes = df_filtered.nsmallest(5, 'Total_Cost_INR')
-        metric_col = 'Total_Cost_INR'
-        metric_name = 'Cost'
-        metric_format = '₹{:,.2f}'
-    elif optimization_priority == "Time":
-        best_routes = df_filtered.nsmallest(5, 'Total_Time_Hours')
-        metric_col = 'Total_Time_Hours'
-        metric_name = 'Time'
-        metric_format = '{:.2f} hrs'
-    elif optimization_priority == "Environmental":
-        best_routes = df_filtered.nsmallest(5, 'CO2_Emissions_KG')
-        metric_col = 'CO2_Emissions_KG'
-        metric_name = 'CO₂'
-        metric_format = '{:.2f} kg'
-    else:  # Balanced
-        best_routes = df_filtered.nlargest(5, 'Balanced_Score')
-        metric_col = 'Balanced_Score'
-        metric_name = 'Score'
-        metric_format = '{:.1f}%'
-    
     col1, col2 = st.columns([1, 1])
     
     with col1:
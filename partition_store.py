@@ -0,0 +1,187 @@
+"""
+Partitioned storage for the route dataset.
+Splits routes_data.csv into Route_Type/Origin partitions and records per-partition
+statistics in a manifest, so filtered loads only read partitions that can match.
+
+Usage:
+    python partition_store.py [routes_data.csv] [routes_partitioned]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+FUEL_PRICE_PER_LITER = 102.0  # INR
+CO2_PER_LITER = 2.68  # kg CO2 per liter of fuel
+INTERNATIONAL_DESTINATIONS = ['Dubai', 'Singapore', 'Hong Kong', 'Bangkok']
+
+DEFAULT_SOURCE = 'routes_data.csv'
+DEFAULT_PARTITION_DIR = 'routes_partitioned'
+MANIFEST_FILE = 'manifest.json'
+PARTITION_FILE = 'part.csv'
+
+
+def prepare_routes(df):
+    """Add derived cost, time, emission and classification columns to raw route data"""
+    # Handle missing values
+    df['Weather_Impact'] = df['Weather_Impact'].fillna('None')
+
+    # Calculate derived metrics
+    df['Fuel_Cost_INR'] = df['Fuel_Consumption_L'] * FUEL_PRICE_PER_LITER
+    df['Total_Cost_INR'] = df['Fuel_Cost_INR'] + df['Toll_Charges_INR']
+    df['CO2_Emissions_KG'] = df['Fuel_Consumption_L'] * CO2_PER_LITER
+    df['Total_Time_Hours'] = (df['Distance_KM'] / 60) + (df['Traffic_Delay_Minutes'] / 60)
+    df['Efficiency_Score'] = 100 - ((df['Total_Cost_INR'] / df['Total_Cost_INR'].max() * 30) +
+                                     (df['Total_Time_Hours'] / df['Total_Time_Hours'].max() * 30) +
+                                     (df['CO2_Emissions_KG'] / df['CO2_Emissions_KG'].max() * 40))
+
+    # Extract origin and destination
+    df[['Origin', 'Destination']] = df['Route'].str.split('-', expand=True)
+
+    # Categorize routes
+    df['Route_Type'] = df['Destination'].apply(
+        lambda x: 'International' if x in INTERNATIONAL_DESTINATIONS else 'Domestic'
+    )
+
+    return df
+
+
+def build_partitions(csv_path=DEFAULT_SOURCE, out_dir=DEFAULT_PARTITION_DIR):
+    """Convert the flat route CSV into a Route_Type/Origin partitioned layout"""
+    # Derived columns are computed over the full dataset so that scores
+    # normalised against dataset-wide maxima stay identical after partitioning
+    df = prepare_routes(pd.read_csv(csv_path))
+
+    # Each build goes into a fresh directory so partitions referenced by the
+    # current manifest are never touched while the app may be reading them
+    os.makedirs(out_dir, exist_ok=True)
+    previous = read_manifest(out_dir, csv_path=None)
+    data_dir = os.path.basename(tempfile.mkdtemp(prefix='data-', dir=out_dir))
+
+    partitions = []
+    for (route_type, origin), part in df.groupby(['Route_Type', 'Origin'], sort=True):
+        rel_path = os.path.join(data_dir, f'Route_Type={route_type}', f'Origin={origin}', PARTITION_FILE)
+        os.makedirs(os.path.dirname(os.path.join(out_dir, rel_path)), exist_ok=True)
+        part.to_csv(os.path.join(out_dir, rel_path), index=False)
+        partitions.append({
+            'path': rel_path,
+            'route_type': route_type,
+            'origin': origin,
+            'rows': len(part),
+            'distance_min': float(part['Distance_KM'].min()),
+            'distance_max': float(part['Distance_KM'].max()),
+            'destinations': sorted(part['Destination'].unique().tolist()),
+            'weather': sorted(part['Weather_Impact'].unique().tolist()),
+        })
+
+    manifest = {
+        'source': os.path.abspath(csv_path),
+        'source_mtime': os.path.getmtime(csv_path),
+        'built_at': time.time(),
+        'data_dir': data_dir,
+        'rows': len(df),
+        'columns': df.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'distance_min': float(df['Distance_KM'].min()),
+        'distance_max': float(df['Distance_KM'].max()),
+        'partitions': partitions,
+    }
+
+    # Point the manifest at the new build atomically, then drop older builds.
+    # The previous build is kept so readers holding the old manifest can finish.
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    keep = {data_dir, previous.get('data_dir') if previous else None}
+    for entry in os.listdir(out_dir):
+        if entry.startswith(('data-', 'Route_Type=')) and entry not in keep:
+            shutil.rmtree(os.path.join(out_dir, entry), ignore_errors=True)
+
+    return manifest
+
+
+def read_manifest(out_dir=DEFAULT_PARTITION_DIR, csv_path=DEFAULT_SOURCE):
+    """Return the partition manifest, or None if it is missing or older than the source CSV"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if csv_path and os.path.exists(csv_path) and os.path.getmtime(csv_path) > manifest['source_mtime']:
+        return None
+
+    return manifest
+
+
+def manifest_options(manifest):
+    """Collect sidebar filter values from the manifest without reading any partition"""
+    partitions = manifest['partitions']
+    return {
+        'route_types': sorted({p['route_type'] for p in partitions}),
+        'origins': sorted({p['origin'] for p in partitions}),
+        'destinations': sorted({d for p in partitions for d in p['destinations']}),
+        'weather': sorted({w for p in partitions for w in p['weather']}),
+        'distance_min': manifest['distance_min'],
+        'distance_max': manifest['distance_max'],
+    }
+
+
+def prune_partitions(manifest, route_type='All', origin='All', destination='All',
+                     weather='All', distance_range=None):
+    """Return the partitions whose keys and statistics can match the given filters"""
+    selected = []
+    for part in manifest['partitions']:
+        if route_type != 'All' and part['route_type'] != route_type:
+            continue
+        if origin != 'All' and part['origin'] != origin:
+            continue
+        if destination != 'All' and destination not in part['destinations']:
+            continue
+        if weather != 'All' and weather not in part['weather']:
+            continue
+        if distance_range is not None and (part['distance_max'] < distance_range[0] or
+                                           part['distance_min'] > distance_range[1]):
+            continue
+        selected.append(part)
+    return selected
+
+
+def load_partitions(manifest, out_dir=DEFAULT_PARTITION_DIR, **filters):
+    """Read and concatenate only the partitions that survive pruning"""
+    return read_partitions(manifest, prune_partitions(manifest, **filters), out_dir)
+
+
+def read_partitions(manifest, partitions, out_dir=DEFAULT_PARTITION_DIR):
+    """Read and concatenate the given manifest partitions"""
+    if not partitions:
+        # Keep the partition dtypes so numeric operations on an empty result still work
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in manifest['dtypes'].items()})
+
+    df = pd.concat(
+        [pd.read_csv(os.path.join(out_dir, p['path']), float_precision='round_trip')
+         for p in partitions],
+        ignore_index=True
+    )
+    df['Weather_Impact'] = df['Weather_Impact'].fillna('None')
+    return df
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PARTITION_DIR
+
+    print(f'Partitioning {csv_path} into {out_dir} ...')
+    manifest = build_partitions(csv_path, out_dir)
+    print(f"Done. Wrote {manifest['rows']} routes to {len(manifest['partitions'])} partitions.")
+
+
+if __name__ == '__main__':
+    main()
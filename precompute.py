@@ -0,0 +1,323 @@
+"""
+Background precomputation for the Smart Route Planner.
+A worker thread warms the route data at server start, precomputes filtered and scored
+results for the most frequently requested filter combinations and priorities, and
+refreshes them whenever the source data changes.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from partition_store import (
+    DEFAULT_SOURCE, DEFAULT_PARTITION_DIR,
+    prepare_routes, read_manifest, load_partitions
+)
+
+QUERY_STATS_FILE = 'query_stats.json'
+MAX_RECORDED_QUERIES = 200
+PRIORITIES = ["Balanced", "Cost", "Time", "Environmental"]
+
+
+# Apply sidebar filters
+def apply_filters(df_filtered, route_type, origin, destination, weather, distance_range):
+    """Filter routes by the sidebar selections"""
+    if route_type != 'All':
+        df_filtered = df_filtered[df_filtered['Route_Type'] == route_type]
+
+    if origin != 'All':
+        df_filtered = df_filtered[df_filtered['Origin'] == origin]
+
+    if destination != 'All':
+        df_filtered = df_filtered[df_filtered['Destination'] == destination]
+
+    if weather != 'All':
+        df_filtered = df_filtered[df_filtered['Weather_Impact'] == weather]
+
+    df_filtered = df_filtered[
+        (df_filtered['Distance_KM'] >= distance_range[0]) &
+        (df_filtered['Distance_KM'] <= distance_range[1])
+    ]
+
+    return df_filtered
+
+
+# Calculate optimization scores
+def calculate_optimization_scores(df_filtered):
+    """Calculate optimization scores for different priorities"""
+    # Cost Optimization (minimize total cost)
+    df_filtered['Cost_Score'] = 100 - (df_filtered['Total_Cost_INR'] / df_filtered['Total_Cost_INR'].max() * 100)
+
+    # Time Optimization (minimize time)
+    df_filtered['Time_Score'] = 100 - (df_filtered['Total_Time_Hours'] / df_filtered['Total_Time_Hours'].max() * 100)
+
+    # Environmental Optimization (minimize emissions)
+    df_filtered['Eco_Score'] = 100 - (df_filtered['CO2_Emissions_KG'] / df_filtered['CO2_Emissions_KG'].max() * 100)
+
+    # Balanced Score (equal weights)
+    df_filtered['Balanced_Score'] = (df_filtered['Cost_Score'] + df_filtered['Time_Score'] + df_filtered['Eco_Score']) / 3
+
+    return df_filtered
+
+
+# Pick the best routes for a priority
+def select_best_routes(df_filtered, optimization_priority):
+    """Return the top 5 routes and how to display their headline metric"""
+    if optimization_priority == "Cost":
+        metric_col, metric_name, metric_format, lowest = 'Total_Cost_INR', 'Cost', '₹{:,.2f}', True
+    elif optimization_priority == "Time":
+        metric_col, metric_name, metric_format, lowest = 'Total_Time_Hours', 'Time', '{:.2f} hrs', True
+    elif optimization_priority == "Environmental":
+        metric_col, metric_name, metric_format, lowest = 'CO2_Emissions_KG', 'CO₂', '{:.2f} kg', True
+    else:  # Balanced
+        metric_col, metric_name, metric_format, lowest = 'Balanced_Score', 'Score', '{:.1f}%', False
+
+    # Nothing to rank when the filters match no routes
+    if df_filtered.empty:
+        best_routes = df_filtered.head(0)
+    elif lowest:
+        best_routes = df_filtered.nsmallest(5, metric_col)
+    else:
+        best_routes = df_filtered.nlargest(5, metric_col)
+
+    return best_routes, metric_col, metric_name, metric_format
+
+
+def compute_results(df_filtered, filters, optimization_priority):
+    """Filter, score and rank routes for one sidebar selection"""
+    df_filtered = calculate_optimization_scores(apply_filters(df_filtered.copy(), *filters))
+    best_routes, metric_col, metric_name, metric_format = select_best_routes(df_filtered, optimization_priority)
+    return {
+        'routes': df_filtered,
+        'best_routes': best_routes,
+        'metric_col': metric_col,
+        'metric_name': metric_name,
+        'metric_format': metric_format,
+    }
+
+
+class PrecomputeWorker:
+    """Keeps precomputed results for popular queries fresh in a background thread"""
+
+    def __init__(self, csv_path=DEFAULT_SOURCE, partition_dir=DEFAULT_PARTITION_DIR,
+                 stats_path=QUERY_STATS_FILE, top_n=20, poll_seconds=30):
+        self.csv_path = csv_path
+        self.partition_dir = partition_dir
+        self.stats_path = stats_path
+        self.top_n = top_n
+        self.poll_seconds = poll_seconds
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='route-precompute', daemon=True)
+
+        self._data = None
+        self._version = None
+        self._results = {}
+        self._failed = set()
+        self._query_counts = self._load_query_counts()
+        self._stats_dirty = False
+        self._metrics = {
+            'state': 'starting',
+            'warmed': 0,
+            'to_warm': 0,
+            'hits': 0,
+            'misses': 0,
+            'failed': 0,
+            'refreshes': 0,
+            'last_refresh': None,
+            'last_error': None,
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._save_query_counts()
+
+    def record_query(self, filters, optimization_priority):
+        """Count a sidebar selection towards the precomputation ranking"""
+        key = (tuple(filters), optimization_priority)
+        with self._lock:
+            self._query_counts[key] += 1
+            self._stats_dirty = True
+            # Only wake the worker for queries popular enough to be precomputed
+            if key not in self._results and key in dict(self._query_counts.most_common(self.top_n)):
+                self._wake.set()
+
+    def get(self, filters, optimization_priority, count=True):
+        """Return precomputed results for current data, or None if not ready"""
+        key = (tuple(filters), optimization_priority)
+        version = self._data_version()
+        with self._lock:
+            result = self._results.get(key) if version == self._version else None
+            if count:
+                self._metrics['hits' if result is not None else 'misses'] += 1
+        if result is None:
+            return None
+        # Callers add columns and slice freely, so never hand out the shared frames
+        return {k: (v.copy() if isinstance(v, pd.DataFrame) else v) for k, v in result.items()}
+
+    def data(self):
+        """Return the warmed full dataset, or None if warm-up has not finished"""
+        with self._lock:
+            if self._data is None or self._version != self._data_version():
+                return None
+            return self._data.copy()
+
+    def metrics(self):
+        """Return warm-up progress and cache hit statistics"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['cached_results'] = len(self._results)
+            metrics['recorded_queries'] = sum(self._query_counts.values())
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
+
+    def _data_version(self):
+        try:
+            return os.path.getmtime(self.csv_path)
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._refresh()
+            except Exception as exc:  # keep serving interactive reruns if a refresh fails
+                with self._lock:
+                    self._metrics['state'] = 'error'
+                    self._metrics['last_error'] = str(exc)
+            self._save_query_counts()
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _refresh(self):
+        version = self._data_version()
+        if version is None:
+            return
+
+        data_changed = version != self._version
+        if data_changed:
+            with self._lock:
+                self._metrics['state'] = 'warming' if self._version is None else 'refreshing'
+            data = self._load_data()
+        else:
+            data = self._data
+
+        wanted = self._wanted_queries(data)
+        with self._lock:
+            existing = {} if data_changed else dict(self._results)
+            failed = set() if data_changed else set(self._failed)
+        # Queries that already failed on this data version are not retried until it changes
+        pending = [key for key in wanted if key not in existing and key not in failed]
+        if not pending and not data_changed:
+            return
+
+        with self._lock:
+            self._metrics['to_warm'] = len(wanted)
+            self._metrics['warmed'] = len(wanted) - len(pending) - len(failed & set(wanted))
+            if data_changed:
+                self._metrics['failed'] = 0
+                self._metrics['last_error'] = None
+
+        manifest = read_manifest(self.partition_dir, self.csv_path)
+        results = {key: existing[key] for key in wanted if key in existing}
+        for filters, priority in pending:
+            if self._stop.is_set():
+                return
+            try:
+                if manifest is not None:
+                    source = load_partitions(
+                        manifest, self.partition_dir,
+                        route_type=filters[0], origin=filters[1], destination=filters[2],
+                        weather=filters[3], distance_range=filters[4]
+                    )
+                else:
+                    source = data
+                results[(filters, priority)] = compute_results(source, filters, priority)
+            except Exception as exc:  # one bad query must not block the rest of the warm-up
+                failed.add((filters, priority))
+                with self._lock:
+                    self._metrics['failed'] += 1
+                    self._metrics['last_error'] = f"{filters}, {priority}: {exc}"
+                continue
+            with self._lock:
+                self._metrics['warmed'] += 1
+
+        # Swap in the finished set at once so readers never mix data versions
+        with self._lock:
+            self._data = data
+            self._version = version
+            self._results = results
+            self._failed = failed
+            self._metrics['state'] = 'ready'
+            if data_changed:
+                self._metrics['refreshes'] += 1
+            self._metrics['last_refresh'] = time.time()
+
+    def _load_data(self):
+        # Partitions are rebuilt only by partition_store.py; a stale layout is
+        # ignored by read_manifest and queries fall back to the flat CSV
+        return prepare_routes(pd.read_csv(self.csv_path))
+
+    def _wanted_queries(self, data):
+        # The unfiltered view is what every session sees first
+        default_filters = ('All', 'All', 'All', 'All',
+                           (float(data['Distance_KM'].min()), float(data['Distance_KM'].max())))
+        wanted = [(default_filters, priority) for priority in PRIORITIES]
+        with self._lock:
+            popular = [key for key, _ in self._query_counts.most_common(self.top_n)]
+        wanted.extend(key for key in popular if key not in wanted)
+        return wanted
+
+    def _load_query_counts(self):
+        try:
+            with open(self.stats_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return Counter()
+
+        if not isinstance(entries, list):
+            return Counter()
+
+        # Skip malformed or old-format entries rather than failing worker start-up
+        counts = Counter()
+        for entry in entries:
+            try:
+                route_type, origin, destination, weather, distance_min, distance_max = entry['filters']
+                key = ((route_type, origin, destination, weather, (float(distance_min), float(distance_max))),
+                       entry['priority'])
+                counts[key] = int(entry['count'])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return counts
+
+    def _save_query_counts(self):
+        with self._lock:
+            if not self._stats_dirty:
+                return
+            # Slider drags create many one-off ranges, so keep only the most frequent
+            self._query_counts = Counter(dict(self._query_counts.most_common(MAX_RECORDED_QUERIES)))
+            entries = [
+                {'filters': list(filters[:4]) + list(filters[4]), 'priority': priority, 'count': count}
+                for (filters, priority), count in self._query_counts.items()
+            ]
+            self._stats_dirty = False
+
+        try:
+            with open(self.stats_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(self.stats_path + '.tmp', self.stats_path)
+        except OSError:
+            pass